@@ -1,7 +1,8 @@
 # backend/app/main.py
 from fastapi import FastAPI, UploadFile, File, HTTPException, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 import uvicorn
 import os
@@ -10,12 +11,20 @@ import csv
 import io
 import xarray as xr
 
+# Optional orjson for JSON responses
+try:
+    import orjson  # noqa: F401  (ORJSONResponse imports it lazily and fails without it)
+    DefaultResponse = ORJSONResponse
+except ImportError:
+    DefaultResponse = JSONResponse
+
 from .db import SessionLocal, engine, Base
 from . import models
 from .inference import save_upload, predict_otolith_stub
 from .alerts import create_advisory_pdf
 from . import alerts, models
 from . import measurements   # near other relative imports
+from .occurrences import filter_occurrences
 from .db import SessionLocal, engine, Base
 from .db import get_db
 
@@ -34,7 +43,7 @@ def root():
     return {"message": "SIH MVP backend is running 🚀"}
 app.include_router(alerts.router)
 
-app = FastAPI(title="SIH MVP Backend", version="0.1.0")
+app = FastAPI(title="SIH MVP Backend", version="0.1.0", default_response_class=DefaultResponse)
 
 app.include_router(measurements.router, prefix="/api/v1")
 
@@ -45,6 +54,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# occurrence/measurement JSON is highly repetitive; small bodies aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 def get_db():
     db = SessionLocal()
@@ -59,10 +70,14 @@ def health():
 
 # Occurrences - return rows from DB
 @app.get("/api/v1/occurrences")
-def get_occurrences(db: Session = Depends(get_db), bbox: str = None, date_from: str = None, date_to: str = None):
-    q = db.query(models.Occurrence)
-    # TODO: implement bbox/date filtering properly
-    rows = q.limit(1000).all()
+def get_occurrences(db: Session = Depends(get_db), bbox: str = None, date_from: str = None, date_to: str = None,
+                    limit: int = 1000, offset: int = 0, format: str = None):
+    try:
+        q = filter_occurrences(db.query(models.Occurrence), bbox=bbox, date_from=date_from, date_to=date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # stable order so limit/offset pages don't overlap
+    rows = q.order_by(models.Occurrence.id).offset(max(offset, 0)).limit(min(max(limit, 1), 1000)).all()
     out = []
     for r in rows:
         out.append({
@@ -75,8 +90,24 @@ def get_occurrences(db: Session = Depends(get_db), bbox: str = None, date_from:
             "provenance": r.provenance,
             "qc_flag": r.qc_flag
         })
+    if format == "arrow":
+        return arrow_response(out)
     return out
 
+def arrow_response(rows: list) -> Response:
+    """Serialise rows as an Arrow IPC stream; nested values (provenance) travel as JSON text."""
+    import json
+    import pyarrow as pa
+
+    for row in rows:
+        if row.get("provenance") is not None:
+            row["provenance"] = json.dumps(row["provenance"])
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+
 # Occurrence ingestion: simple CSV ingestion (ETL endpoint)
 @app.post("/api/v1/occurrences/load")
 def load_occurrences_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
@@ -40,7 +40,8 @@ async def load_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"CSV parse error: {e}")
 
     inserted = 0
-    for _, r in df.iterrows():
+    # plain dicts keep the r.get(...) lookups below without building a Series per row
+    for r in df.to_dict("records"):
         try:
             sst = float(r.get("sst") or r.get("SST"))
             chl = float(r.get("chl") or r.get("Chl") or r.get("chlorophyll", 0.0))
@@ -0,0 +1,26 @@
+# backend/app/occurrences.py
+from sqlalchemy import func
+
+from . import models
+
+
+def parse_bbox(bbox: str):
+    """Parse 'minlon,minlat,maxlon,maxlat' into four floats; raises ValueError on bad input."""
+    parts = [float(p) for p in bbox.split(",")]
+    if len(parts) != 4:
+        raise ValueError(f"bbox needs 4 comma-separated numbers, got {bbox!r}")
+    return parts
+
+
+def filter_occurrences(q, bbox: str = None, date_from: str = None, date_to: str = None):
+    """Apply bbox/date filters in SQL so only the rows a client will plot leave the database."""
+    if bbox:
+        minlon, minlat, maxlon, maxlat = parse_bbox(bbox)
+        q = q.filter(models.Occurrence.decimalLongitude.between(minlon, maxlon),
+                     models.Occurrence.decimalLatitude.between(minlat, maxlat))
+    # eventDate is stored as ISO text; compare on the date part so date_to is inclusive
+    if date_from:
+        q = q.filter(func.substr(models.Occurrence.eventDate, 1, 10) >= date_from)
+    if date_to:
+        q = q.filter(func.substr(models.Occurrence.eventDate, 1, 10) <= date_to)
+    return q
@@ -4,14 +4,29 @@ from contextlib import contextmanager
 from pathlib import Path
 import io
 import csv
+import functools
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Optional: orjson decodes the occurrence/measurement payloads several times faster than stdlib json
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
 
 # Import backend models + helpers
 from backend.app.db import SessionLocal, Base, engine
 from backend.app import models
-# import functions we will reuse
-from backend.app import alerts as alerts_module
-from backend.app import measurements as measurements_module
+# backend.app.alerts pulls in fastapi and reportlab, so it is imported only by the local-mode calls that need it
 from backend.app.inference import predict_otolith_stub, save_upload
+from backend.app.occurrences import filter_occurrences
 from backend.app.notifications import send_notifications
 
 # Ensure DB/tables exist
@@ -22,6 +37,58 @@ Base.metadata.create_all(bind=engine)
 USE_REMOTE = bool(os.environ.get("SIH_BACKEND_URL"))  # if set, will use remote HTTP
 REMOTE_BASE = os.environ.get("SIH_BACKEND_URL", "").rstrip("/")
 
+def remote_base(base_url: str = None) -> str:
+    """Backend root for one call: `base_url` when given ("" forces local mode), else SIH_BACKEND_URL."""
+    return REMOTE_BASE if base_url is None else base_url.rstrip("/")
+
+@functools.lru_cache(maxsize=None)
+def get_session() -> requests.Session:
+    """One pooled keep-alive session per process, built on the first remote call.
+
+    This module is imported once per process (Streamlit reruns don't re-import it), so the
+    cache here is the process-wide singleton; local mode never builds a pool at all.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                          max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # ACCEPT_ENCODING is "gzip,deflate" plus br/zstd only when urllib3 can decode them
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": ACCEPT_ENCODING,
+                            "User-Agent": "sih-frontend/1", "Connection": "keep-alive"})
+    return session
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# In-flight request coalescing: identical concurrent calls share one backend round trip
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def coalesce(fn):
+    """Concurrent calls with the same arguments wait on the first caller's result instead of re-fetching."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__name__, args, frozenset(kwargs.items()))
+        with _INFLIGHT_LOCK:
+            future = _INFLIGHT.get(key)
+            owner = future is None
+            if owner:
+                future = _INFLIGHT[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with _INFLIGHT_LOCK:
+                _INFLIGHT.pop(key, None)
+    return wrapper
+
 @contextmanager
 def db_session():
     db = SessionLocal()
@@ -32,22 +99,24 @@ def db_session():
 
 
 # ---------- Health ----------
-def health():
-    if USE_REMOTE:
-        import requests
-        r = requests.get(f"{REMOTE_BASE}/health", timeout=5)
-        return r.json()
+@coalesce
+def health(base_url: str = None):
+    base = remote_base(base_url)
+    if base:
+        r = get_session().get(f"{base}/health", timeout=5)
+        return _loads(r.content)
     return {"status": "ok"}
 
 
 # ---------- Alerts ----------
-def fetch_alerts(limit=50):
+@coalesce
+def fetch_alerts(limit=50, base_url: str = None):
     """Return list-of-dicts like the API /alerts"""
-    if USE_REMOTE:
-        import requests
-        r = requests.get(f"{REMOTE_BASE}/alerts", timeout=6)
+    base = remote_base(base_url)
+    if base:
+        r = get_session().get(f"{base}/alerts", timeout=6)
         try:
-            return r.json()
+            return _loads(r.content)
         except Exception:
             return []
     with db_session() as db:
@@ -68,26 +137,27 @@ def fetch_alerts(limit=50):
         return {"alerts": out} if out else []
 
 
-def run_detector(payload: dict = None):
+def run_detector(payload: dict = None, base_url: str = None):
     """Call the anomaly detection logic that used to be at POST /alerts/check"""
     payload = payload or {}
-    if USE_REMOTE:
-        import requests
-        r = requests.post(f"{REMOTE_BASE}/alerts/check", json=payload, timeout=10)
-        return r.json()
+    base = remote_base(base_url)
+    if base:
+        r = get_session().post(f"{base}/alerts/check", json=payload, timeout=10)
+        return _loads(r.content)
+    from backend.app import alerts as alerts_module
     with db_session() as db:
         # alerts_module.run_check expects (payload, db) signature where db can be passed manually
         return alerts_module.run_check(payload=payload, db=db)
 
 
-def download_alert_pdf_bytes(alert_id: int):
+def download_alert_pdf_bytes(alert_id: int, base_url: str = None):
     """Return advisory PDF bytes or None"""
-    if USE_REMOTE:
-        import requests
-        endpoints = [f"{REMOTE_BASE}/alerts/{alert_id}/pdf", f"{REMOTE_BASE}/alerts/{alert_id}/export_pdf"]
+    base = remote_base(base_url)
+    if base:
+        endpoints = [f"{base}/alerts/{alert_id}/pdf", f"{base}/alerts/{alert_id}/export_pdf"]
         for url in endpoints:
             try:
-                r = requests.get(url, timeout=10)
+                r = get_session().get(url, headers={"Accept": "application/pdf"}, timeout=10)
                 if r.status_code == 200 and r.headers.get("content-type","").startswith("application/pdf"):
                     return r.content
             except Exception:
@@ -106,16 +176,17 @@ def download_alert_pdf_bytes(alert_id: int):
             "status": a.status,
             "message": a.message,
         }
+        from backend.app import alerts as alerts_module
         return alerts_module.create_advisory_pdf(alert_dict)
 
 
-def send_notify(alert_id: int, channels: list, targets: dict):
+def send_notify(alert_id: int, channels: list, targets: dict, base_url: str = None):
     """Mock notifications and update DB notified flag"""
-    if USE_REMOTE:
-        import requests
-        r = requests.post(f"{REMOTE_BASE}/alerts/{alert_id}/notify", json={"channels": channels, "targets": targets}, timeout=10)
+    base = remote_base(base_url)
+    if base:
+        r = get_session().post(f"{base}/alerts/{alert_id}/notify", json={"channels": channels, "targets": targets}, timeout=10)
         try:
-            return r.json()
+            return _loads(r.content)
         except Exception:
             return {"error": "notify failed"}
     with db_session() as db:
@@ -132,24 +203,37 @@ def send_notify(alert_id: int, channels: list, targets: dict):
 
 
 # ---------- Occurrences ----------
-def fetch_occurrences(limit: int = 1000, date_from: str = None, date_to: str = None):
-    if USE_REMOTE:
-        import requests
+@coalesce
+def fetch_occurrences(limit: int = 1000, date_from: str = None, date_to: str = None,
+                      bbox: str = None, offset: int = 0, base_url: str = None):
+    """Occurrences filtered server-side by bbox ('minlon,minlat,maxlon,maxlat') and date; page with offset."""
+    base = remote_base(base_url)
+    if base:
         params = {}
         if limit:
             params["limit"] = limit
+        if offset:
+            params["offset"] = offset
+        if bbox:
+            params["bbox"] = bbox
         if date_from:
             params["date_from"] = date_from
         if date_to:
             params["date_to"] = date_to
-        r = requests.get(f"{REMOTE_BASE}/occurrences", params=params, timeout=8)
+        # ask for Arrow; a backend that ignores `format` still answers with JSON
+        params["format"] = "arrow"
+        r = get_session().get(f"{base}/occurrences", params=params, timeout=8,
+                         headers={"Accept": f"{ARROW_STREAM}, application/json"})
+        if r.headers.get("content-type", "").startswith(ARROW_STREAM):
+            import pyarrow as pa
+            return pa.ipc.open_stream(r.content).read_all().to_pandas()
         try:
-            return r.json()
+            return _loads(r.content)
         except Exception:
             return []
     with db_session() as db:
-        q = db.query(models.Occurrence)
-        rows = q.limit(limit).all()
+        q = filter_occurrences(db.query(models.Occurrence), bbox=bbox, date_from=date_from, date_to=date_to)
+        rows = q.order_by(models.Occurrence.id).offset(offset).limit(limit).all()
         out = []
         for r in rows:
             out.append({
@@ -166,13 +250,13 @@ def fetch_occurrences(limit: int = 1000, date_from: str = None, date_to: str = N
         return out
 
 
-def load_occurrences_csv(file_bytes: bytes, filename: str = "uploaded.csv"):
+def load_occurrences_csv(file_bytes: bytes, filename: str = "uploaded.csv", base_url: str = None):
     """Accept bytes of CSV (same behavior as /occurrences/load)"""
-    if USE_REMOTE:
-        import requests
+    base = remote_base(base_url)
+    if base:
         files = {"file": (filename, io.BytesIO(file_bytes), "text/csv")}
-        r = requests.post(f"{REMOTE_BASE}/occurrences/load", files=files, timeout=60)
-        return r.json()
+        r = get_session().post(f"{base}/occurrences/load", files=files, timeout=60)
+        return _loads(r.content)
     text = file_bytes.decode("utf-8")
     reader = csv.DictReader(io.StringIO(text))
     with db_session() as db:
@@ -199,12 +283,13 @@ def load_occurrences_csv(file_bytes: bytes, filename: str = "uploaded.csv"):
 
 
 # ---------- Measurements ----------
-def get_recent_measurements(limit: int = 200):
-    if USE_REMOTE:
-        import requests
-        r = requests.get(f"{REMOTE_BASE}/measurements/recent", params={"limit": limit}, timeout=8)
+@coalesce
+def get_recent_measurements(limit: int = 200, base_url: str = None):
+    base = remote_base(base_url)
+    if base:
+        r = get_session().get(f"{base}/measurements/recent", params={"limit": limit}, timeout=8)
         try:
-            return r.json()
+            return _loads(r.content)
         except Exception:
             return []
     with db_session() as db:
@@ -220,18 +305,18 @@ def get_recent_measurements(limit: int = 200):
 
 
 # ---------- Otoliths (stub) ----------
-def predict_otolith(file_bytes: bytes, filename: str):
-    """Use your inference stub locally."""
-    if USE_REMOTE:
-        import requests
-        files = {"file": (filename, io.BytesIO(file_bytes), "image/jpeg")}
-        r = requests.post(f"{REMOTE_BASE}/otoliths/predict", files=files, timeout=30)
+def predict_otolith(file_obj, filename: str, base_url: str = None):
+    """Use your inference stub locally. `file_obj` is any readable binary file-like object."""
+    base = remote_base(base_url)
+    if base:
+        files = {"file": (filename, file_obj, "image/jpeg")}
+        r = get_session().post(f"{base}/otoliths/predict", files=files, timeout=30)
         try:
-            return r.json()
+            return _loads(r.content)
         except Exception:
             return {"error": "predict failed"}
     # Local: write to tmp path then call predict_otolith_stub
-    tmp_path = save_upload(io.BytesIO(file_bytes), filename)  # save_upload expects a file-like; see backend.app.inference.save_upload
+    tmp_path = save_upload(file_obj, filename)  # save_upload expects a file-like; see backend.app.inference.save_upload
     return predict_otolith_stub(tmp_path)
 
 # ---------- Demo seeding ----------
@@ -3,7 +3,6 @@ from io import BytesIO
 from typing import List, Dict
 import streamlit as st
 import folium
-from folium.plugins import MarkerCluster
 from streamlit_folium import st_folium
 from datetime import datetime , timezone
 
@@ -71,16 +70,31 @@ def send_alert_notification(alert_id: int, channels: List[str], targets: Dict):
 # ----------------------------
 # Map creation
 # ----------------------------
+def alerts_geojson(alerts: List[Dict]) -> Dict:
+    """One FeatureCollection for all alerts; colour is precomputed from status."""
+    features = [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [a["lon"], a["lat"]]},
+        "properties": {
+            "type": a.get("type"),
+            "status": a.get("status"),
+            "message": a.get("message"),
+            "color": "red" if a.get("status") == "active" else "orange",
+        },
+    } for a in alerts if a.get("lat") is not None and a.get("lon") is not None]
+    return {"type": "FeatureCollection", "features": features}
+
 def create_map(alerts: List[Dict], center=(9.9, 76.6), zoom_start: int = 5):
     m = folium.Map(location=center, zoom_start=zoom_start, tiles="cartodbpositron")
-    cluster = MarkerCluster().add_to(m)
-
-    for a in alerts:
-        lat, lon = a.get("lat"), a.get("lon")
-        if lat is None or lon is None:
-            continue
-        popup_html = f"<b>{a.get('type')}</b><br>Status: {a.get('status')}<br>Message: {a.get('message')}"
-        folium.Marker([lat, lon], popup=popup_html).add_to(cluster)
+    fc = alerts_geojson(alerts)
+    if not fc["features"]:
+        return m
+    folium.GeoJson(
+        fc,
+        marker=folium.CircleMarker(radius=8, fill=True, fill_opacity=0.7),
+        style_function=lambda f: {"color": f["properties"]["color"], "fillColor": f["properties"]["color"]},
+        popup=folium.GeoJsonPopup(fields=["type", "status", "message"], aliases=["Type", "Status", "Message"]),
+    ).add_to(m)
     return m
 
 # ----------------------------
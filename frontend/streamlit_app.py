@@ -15,21 +15,21 @@ Features:
 
 import os
 import io
+import importlib
 import logging
-import json
-from datetime import datetime, date, timedelta , timezone
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, date
 from typing import Optional, List, Dict
 
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
-from PIL import Image
-
-import folium
-from folium.plugins import HeatMap, MarkerCluster
-from streamlit_folium import st_folium
-import plotly.express as px
 import sys
+# folium, pydeck and PIL are imported inside the functions that use them
 
 # Ensure backend_client import works
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -39,7 +39,7 @@ from frontend import backend_client
 try:
     from dotenv import load_dotenv
     load_dotenv()
-except Exception:
+except ImportError:
     pass  # it's optional; environment variables may be set elsewhere
 
 # ----------------------------
@@ -48,18 +48,18 @@ except Exception:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("sih_frontend")
 
-DEFAULT_BACKEND = os.getenv("SIH_BACKEND_URL", "http://127.0.0.1:8000/api/v1")
+# empty means backend_client's in-process local mode (the Streamlit Cloud default)
+DEFAULT_BACKEND = os.getenv("SIH_BACKEND_URL", "")
 DEFAULT_MAPBOX = os.getenv("MAPBOX_TOKEN", "")
 
+# Above this many points the Home map is drawn with deck.gl (WebGL) instead of folium markers
+MAP_WEBGL_THRESHOLD = 2000
+# occurrences fetched per request; "Load more" appends the next page of this size
+OCC_PAGE_SIZE = 200
+
 # Streamlit page config
 st.set_page_config(page_title="SIH MVP Dashboard", layout="wide", initial_sidebar_state="expanded")
 
-try:
-    backend_client.ensure_seeded()
-except Exception:
-    # don't crash startup on seed errors
-    pass
-
 # ----------------------------
 # Utility helpers
 # ----------------------------
@@ -73,6 +73,33 @@ def get_setting(key: str, default: str = "") -> str:
 def set_setting(key: str, value: str):
     st.session_state[key] = value
 
+def display_dataframe(df: pd.DataFrame, max_rows: int = 20):
+    """Safe display of a dataframe with optional truncation."""
+    if df.empty:
+        st.write("No data available.")
+        return
+    st.dataframe(df.iloc[:max_rows], hide_index=True)
+
+@st.cache_data(max_entries=8)
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV bytes for a download button, via pyarrow's C++ writer when the frame allows it.
+
+    The button needs its bytes on every rerun, so they are cached on the frame contents and only
+    written again when the data changes.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        return df.to_csv(index=False).encode("utf-8")
+    try:
+        sink = io.BytesIO()
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), sink)
+        return sink.getvalue()
+    except pa.ArrowException:
+        # nested columns (e.g. provenance dicts) have no CSV representation in Arrow
+        return df.to_csv(index=False).encode("utf-8")
+
 # Initialize settings in session
 if "SIH_BACKEND_URL" not in st.session_state:
     st.session_state["SIH_BACKEND_URL"] = DEFAULT_BACKEND
@@ -81,68 +108,220 @@ if "MAPBOX_TOKEN" not in st.session_state:
 
 BACKEND_API = lambda: st.session_state.get("SIH_BACKEND_URL", DEFAULT_BACKEND)
 
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide worker pool used to overlap backend I/O with page rendering."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="sih-io")
+
+@st.cache_resource
+def seed_future():
+    """Seed the demo DB once per process, in the background instead of on every rerun's critical path."""
+    return get_executor().submit(backend_client.ensure_seeded)
+
+def wait_for_seed():
+    """Block until seeding is done; only pages that read seeded tables need to call this."""
+    try:
+        seed_future().result()
+    except Exception as e:
+        # don't crash the page on seed errors; drop the failed Future so the next call retries
+        logger.warning(f"ensure_seeded failed: {e}")
+        seed_future.clear()
+
+seed_future()
+
+# Start the default occurrence fetch once per session so "Load occurrences" finds it ready.
+# It is consumed at most once, outside the fetch cache, and only while younger than that cache's TTL,
+# so it is never staler than a cache hit would be.
+PREWARM_MAX_AGE = 120
+if "prewarm_at" not in st.session_state:
+    st.session_state["prewarm_at"] = time.monotonic()
+    st.session_state["prewarm_url"] = BACKEND_API()
+    st.session_state["prewarm"] = get_executor().submit(backend_client.fetch_occurrences, limit=OCC_PAGE_SIZE,
+                                                        base_url=BACKEND_API())
+
 # ----------------------------
 # Synthetic / fallback data
 # ----------------------------
-@st.cache_data(ttl=300)
-def synthetic_occurrences(n=120, bbox=(66.0, 6.0, 92.0, 24.0)):
+@st.cache_resource(ttl=300)
+def _synthetic_occurrences(n, bbox):
     minlon, minlat, maxlon, maxlat = bbox
     rng = np.random.default_rng(seed=42)
     lons = rng.uniform(minlon, maxlon, n)
     lats = rng.uniform(minlat, maxlat, n)
     species = ["Sardinella longiceps", "Thunnus albacares", "Katsuwonus pelamis", "Rastrelliger kanagurta"]
-    rows = []
-    for i in range(n):
-        rows.append({
-            "occurrenceID": f"synthetic-{i}",
-            "scientificName": rng.choice(species),
-            "eventDate": (date.today() - timedelta(days=int(rng.integers(0, 365)))).isoformat(),
-            "decimalLatitude": float(lats[i]),
-            "decimalLongitude": float(lons[i]),
-            "datasetID": "synthetic_demo_v1",
-            "provenance": {"source": "synthetic", "fetched_at": datetime.utcnow().isoformat()},
-            "qc_flag": rng.choice(["ok", "suspect"])
-        })
-    return pd.DataFrame(rows)
+    days = rng.integers(0, 365, n)
+    dates = (pd.Timestamp(date.today()) - pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "occurrenceID": np.char.add("synthetic-", np.arange(n).astype(str)),
+        "scientificName": rng.choice(species, n),
+        "eventDate": dates,
+        "decimalLatitude": lats,
+        "decimalLongitude": lons,
+        "datasetID": "synthetic_demo_v1",
+        "qc_flag": rng.choice(["ok", "suspect"], n),
+    })
+    # identical for every row, so it is kept once on the frame rather than as an object column
+    df.attrs["provenance"] = {"source": "synthetic", "fetched_at": datetime.utcnow().isoformat()}
+    return df
 
-@st.cache_data(ttl=300)
-def synthetic_alerts():
+def synthetic_occurrences(n=120, bbox=(66.0, 6.0, 92.0, 24.0)):
+    """Seeded demo occurrences. The generator is a pure function of its arguments, so it is held as a
+    resource (no pickling on every hit) and callers get their own copy to modify."""
+    return _synthetic_occurrences(n, bbox).copy()
+
+@st.cache_resource(ttl=300)
+def _synthetic_alerts():
     now = datetime.utcnow().isoformat()
-    return [
+    return (
         {"id": 1, "type": "SST anomaly", "status": "active", "message": "SST +2.1°C above climatology", "time": now, "lat": 16.5, "lon": 72.3},
         {"id": 2, "type": "HAB-like", "status": "resolved", "message": "Chl spike observed", "time": now, "lat": 18.7, "lon": 82.1},
-    ]
+    )
+
+def synthetic_alerts():
+    return [dict(a) for a in _synthetic_alerts()]
+
+@st.cache_data(ttl=300)
+def synthetic_measurements(limit: int = 200):
+    rng = np.random.default_rng()
+    # hourly readings going back from now (UTC), matching the dtype of the backend path
+    now = np.datetime64("now", "s")
+    return pd.DataFrame({
+        "sst": 27 + rng.random(limit),
+        "chl": 0.3 + rng.random(limit) * 0.1,
+        "timestamp": now - np.arange(limit).astype("timedelta64[h]"),
+        "lat": 16 + rng.random(limit),
+        "lon": 72 + rng.random(limit),
+    })
 
 # ----------------------------
 # Data fetch wrappers
 # ----------------------------
+@dataclass(frozen=True)
+class OccQuery:
+    """Occurrence filters as one hashable value, so the fetch cache key is stable across reruns."""
+    bbox: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    limit: int = OCC_PAGE_SIZE
+    offset: int = 0
+
+def canonical_bbox(text: str) -> Optional[str]:
+    """'minlon,minlat,maxlon,maxlat' snapped outward to a 0.1° grid, so nearby boxes share a cache entry.
+
+    Raises ValueError unless the text holds exactly four numbers.
+    """
+    if not text or not text.strip():
+        return None
+    minlon, minlat, maxlon, maxlat = (float(p) for p in text.split(","))
+    snapped = np.floor(np.array([minlon, minlat]) * 10), np.ceil(np.array([maxlon, maxlat]) * 10)
+    return ",".join(f"{v / 10:.1f}" for v in np.concatenate(snapped))
+
+COORD_ALIASES = {
+    "lat": "decimalLatitude",
+    "latitude": "decimalLatitude",
+    "lon": "decimalLongitude",
+    "longitude": "decimalLongitude",
+}
+
+def records_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Build a DataFrame from uniform backend records.
+
+    The backend emits the same keys for every row, so the column set is taken from the
+    first record instead of letting pandas union the keys of every dict.
+    """
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame.from_records(records, columns=list(records[0]))
+
 @st.cache_data(ttl=120)
-def fetch_occurrences(bbox: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None) -> pd.DataFrame:
-    """Try backend_client, otherwise return synthetic DataFrame."""
+def fetch_occurrences(backend_url: str, query: OccQuery = OccQuery()) -> pd.DataFrame:
+    """Occurrences for `query` from `backend_url` ("" for local mode), synthetic if the call fails."""
     try:
-        res = backend_client.fetch_occurrences(limit=1000, date_from=date_from, date_to=date_to)
+        res = backend_client.fetch_occurrences(limit=query.limit, offset=query.offset, bbox=query.bbox,
+                                               date_from=query.date_from.isoformat() if query.date_from else None,
+                                               date_to=query.date_to.isoformat() if query.date_to else None,
+                                               base_url=backend_url)
     except Exception as e:
         logger.error(f"fetch_occurrences failed: {e}")
         res = None
+    return occurrences_frame(res, demo_if_empty=query == OccQuery())
 
-    if not res:
-        return synthetic_occurrences()
+def take_prewarmed_occurrences(backend_url: str, query: OccQuery) -> Optional[pd.DataFrame]:
+    """The startup fetch, if it matches `query` and is still fresh; None means fetch normally.
 
-    if isinstance(res, list):
-        df = pd.DataFrame(res)
+    Kept out of fetch_occurrences: the Future lives in this session's state, which must not
+    become a hidden input to a cache shared by every session.
+    """
+    prewarm = st.session_state.pop("prewarm", None)
+    if prewarm is None or query != OccQuery() or backend_url != st.session_state.get("prewarm_url"):
+        return None
+    if time.monotonic() - st.session_state["prewarm_at"] > PREWARM_MAX_AGE:
+        return None
+    try:
+        # same request is already in flight from startup; wait on it instead of repeating it
+        return occurrences_frame(prewarm.result(), demo_if_empty=True)
+    except Exception as e:
+        logger.error(f"prewarmed fetch_occurrences failed: {e}")
+        return None
+
+def occurrences_frame(res, demo_if_empty: bool = False) -> pd.DataFrame:
+    """Normalised occurrence frame from whatever backend_client returned; synthetic if the call failed.
+
+    An empty filtered result is a real answer; only the unfiltered default (`demo_if_empty`) falls
+    back to demo rows, so a fresh deploy with no occurrences still has something to show.
+    """
+    if res is None:
+        df = synthetic_occurrences()
+    elif isinstance(res, pd.DataFrame):
+        # Arrow stream from the backend arrives already columnar
+        df = res
+    elif isinstance(res, list):
+        df = records_to_frame(res)
     elif isinstance(res, dict) and "data" in res:
-        df = pd.DataFrame(res["data"])
+        df = records_to_frame(res["data"])
     else:
         df = pd.DataFrame([res])
-
-    if "decimalLatitude" not in df.columns and "lat" in df.columns:
-        df = df.rename(columns={"lat": "decimalLatitude", "lon": "decimalLongitude"})
+    if demo_if_empty and df.empty:
+        df = synthetic_occurrences()
+    return normalize_occurrences(df)
+
+def normalize_occurrences(df: pd.DataFrame) -> pd.DataFrame:
+    """Darwin Core coordinate names, numeric coordinates, cached view and categorical strings."""
+    df = df.rename(columns={src: dst for src, dst in COORD_ALIASES.items()
+                            if src in df.columns and dst not in df.columns})
+    if "decimalLatitude" in df.columns and "decimalLongitude" in df.columns:
+        # one vectorised coercion here, so the map never has to validate coordinates row by row;
+        # kept float64: float32 values widen to long decimals (17.465299606323242) when the
+        # map layers serialise them to JSON, which makes the rendered map larger, not smaller
+        df["decimalLatitude"] = pd.to_numeric(df["decimalLatitude"], errors="coerce")
+        df["decimalLongitude"] = pd.to_numeric(df["decimalLongitude"], errors="coerce")
+        df = df.dropna(subset=["decimalLatitude", "decimalLongitude"])
+        # stored with the cached frame so reruns don't reduce both columns again; zooming to the
+        # data's extent keeps every marker in view without the user having to pan around
+        coords = df[["decimalLatitude", "decimalLongitude"]].to_numpy()
+        if len(coords):
+            span = np.ptp(coords, axis=0).max()
+            df.attrs["center"] = tuple(coords.mean(axis=0).tolist())
+            df.attrs["zoom"] = int(np.clip(8 - np.log2(span + 1e-3), 3, 11))
+    # hash each repeated string once; filtering and counting then work on the category codes
+    for col in ("scientificName", "datasetID", "qc_flag", "basisOfRecord", "kingdom", "phylum"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
+def filter_species(df: pd.DataFrame, search_name: str) -> pd.DataFrame:
+    """Case-insensitive substring filter on scientificName, matched against the categories only."""
+    names = df["scientificName"]
+    if not isinstance(names.dtype, pd.CategoricalDtype):
+        names = names.astype("category")
+    mask_cats = names.cat.categories.str.contains(search_name, case=False, regex=False, na=False)
+    return df[names.cat.codes.isin(np.flatnonzero(mask_cats))]
+
 @st.cache_data(ttl=120)
-def fetch_alerts() -> List[Dict]:
+def fetch_alerts(backend_url: str) -> List[Dict]:
+    """Alerts from `backend_url` ("" for local mode) or the synthetic pair."""
     try:
-        res = backend_client.fetch_alerts(limit=50)
+        res = backend_client.fetch_alerts(limit=50, base_url=backend_url)
     except Exception as e:
         logger.error(f"fetch_alerts failed: {e}")
         res = None
@@ -157,63 +336,119 @@ def fetch_alerts() -> List[Dict]:
 # ----------------------------
 # Measurements & Ocean Data
 # ----------------------------
+MEASUREMENT_COLUMNS = ["sst", "chl", "timestamp", "lat", "lon"]
+# concrete numeric dtypes let the table go to Arrow without per-cell object conversion;
+# readings fit in float32, coordinates keep full precision for the map
+MEASUREMENT_DTYPES = {"sst": "float32", "chl": "float32", "lat": "float64", "lon": "float64"}
+
 @st.cache_data(ttl=120)
-def fetch_recent_measurements(limit: int = 200) -> pd.DataFrame:
+def fetch_recent_measurements(backend_url: str, limit: int = 200) -> pd.DataFrame:
     """Try backend_client, otherwise return synthetic DataFrame."""
+    wait_for_seed()
     try:
-        res = backend_client.get_recent_measurements(limit=limit)
+        res = backend_client.get_recent_measurements(limit=limit, base_url=backend_url)
     except Exception as e:
         logger.error(f"fetch_recent_measurements failed: {e}")
         res = None
 
     if not res:
-        # synthetic fallback
-        now = datetime.utcnow()
-        df = pd.DataFrame([{
-            "sst": 27 + np.random.rand(),
-            "chl": 0.3 + np.random.rand() * 0.1,
-            "timestamp": (now - timedelta(hours=i)).isoformat(),
-            "lat": 16 + np.random.rand(),
-            "lon": 72 + np.random.rand()
-        } for i in range(limit)])
+        df = synthetic_measurements(limit)
     else:
-        df = pd.DataFrame(res)
-    return df
+        # fixed schema: no per-row key discovery, and local-mode rows without sst/chl still get the columns
+        df = pd.DataFrame.from_records(res, columns=MEASUREMENT_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        # JSON/local rows can carry numbers as strings (lat/lon are stored as text) or None
+        for col in MEASUREMENT_DTYPES:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.astype(MEASUREMENT_DTYPES)
 
 # ----------------------------
 # Otoliths upload & inference
 # ----------------------------
+OTOLITH_MAX_SIZE = (512, 512)
+
+@st.cache_data(max_entries=32)
+def downscale_image(image_bytes: bytes, max_size=OTOLITH_MAX_SIZE) -> bytes:
+    """Shrink an upload to the model's input scale and re-encode as JPEG before it goes over the wire.
+
+    Cached on the upload bytes, so reruns with the same file skip the decode/resample/encode pass.
+    """
+    from PIL import Image, ImageOps
+
+    # bake in the EXIF orientation first: the JPEG written below carries no EXIF, so a
+    # rotated phone photo would otherwise reach the model sideways
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes))).convert("RGB")
+    image.thumbnail(max_size, Image.Resampling.BILINEAR)
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
 def handle_otolith_upload(uploaded_file):
     if uploaded_file is None:
         return None
 
-    bytes_data = uploaded_file.read()
+    # hand file objects through rather than reading into fresh bytes at each step
+    file_obj = uploaded_file
     filename = uploaded_file.name
     try:
-        result = backend_client.predict_otolith(bytes_data, filename)
+        file_obj = io.BytesIO(downscale_image(uploaded_file.getvalue()))
+        filename = os.path.splitext(filename)[0] + ".jpg"
+    except Exception as e:
+        # not something PIL can decode; let the backend see the original file
+        logger.warning(f"Otolith downscale skipped: {e}")
+        uploaded_file.seek(0)
+    try:
+        result = backend_client.predict_otolith(file_obj, filename, base_url=BACKEND_API())
     except Exception as e:
         logger.error(f"Otolith prediction failed: {e}")
         return {"error": str(e)}
 
     return result
 
+# ----------------------------
+# eDNA CSV parsing
+# ----------------------------
+def read_uploaded_csv(data: bytes) -> pd.DataFrame:
+    """Parse an uploaded CSV with Arrow's multithreaded reader, falling back to the pandas C engine."""
+    try:
+        return pd.read_csv(io.BytesIO(data), engine="pyarrow", dtype_backend="pyarrow")
+    except (ImportError, ValueError) as e:
+        logger.warning(f"pyarrow CSV parse failed, using pandas engine: {e}")
+        return pd.read_csv(io.BytesIO(data))
+
+def summarize_edna(df: pd.DataFrame) -> Optional[pd.Series]:
+    """Reads per taxon for ASV-style tables (taxon, count), or records per species for occurrence CSVs."""
+    if {"taxon", "count"} <= set(df.columns):
+        return df.groupby("taxon", observed=True, sort=False)["count"].sum().sort_values(ascending=False)
+    if "scientificName" in df.columns:
+        return df["scientificName"].value_counts()
+    return None
+
 # ----------------------------
 # PDF advisory download
 # ----------------------------
-def download_alert_pdf(alert_id: int):
+def download_alert_pdf(alert_id: int, backend_url: str):
     try:
-        pdf_bytes = backend_client.download_alert_pdf_bytes(alert_id)
+        pdf_bytes = backend_client.download_alert_pdf_bytes(alert_id, base_url=backend_url)
     except Exception as e:
         logger.error(f"download_alert_pdf failed: {e}")
         pdf_bytes = None
     return pdf_bytes
 
+def download_alert_pdfs(alert_ids: List[int], backend_url: str) -> Dict[int, Optional[bytes]]:
+    """Fetch several advisory PDFs concurrently; total wait is the slowest call, not the sum.
+
+    The URL is passed in because the worker threads can't read this session's state.
+    """
+    urls = [backend_url] * len(alert_ids)
+    return dict(zip(alert_ids, get_executor().map(download_alert_pdf, alert_ids, urls)))
+
 # ----------------------------
 # Notification sending
 # ----------------------------
 def send_alert_notification(alert_id: int, channels: List[str], targets: Dict):
     try:
-        res = backend_client.send_notify(alert_id, channels, targets)
+        res = backend_client.send_notify(alert_id, channels, targets, base_url=BACKEND_API())
     except Exception as e:
         logger.error(f"send_alert_notification failed: {e}")
         res = {"error": str(e)}
@@ -222,26 +457,118 @@ def send_alert_notification(alert_id: int, channels: List[str], targets: Dict):
 # ----------------------------
 # Map helpers
 # ----------------------------
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+}
+"""
+
+def build_popups(df: pd.DataFrame, fields: List[str]) -> pd.Series:
+    """Popup HTML for every row, built column-wise instead of one f-string per marker."""
+    if not fields:
+        return pd.Series("", index=df.index)
+    # object first so categoricals accept the "-" placeholder instead of rendering "nan"
+    parts = [f"<b>{f}:</b> " + df[f].astype(object).fillna("-").astype(str) for f in fields]
+    return parts[0].str.cat(parts[1:], sep="<br>")
+
 def create_map(df: pd.DataFrame,
                center=(9.9, 76.6),
                zoom_start: int = 5,
                popup_fields: Optional[List[str]] = None):
     """Generate folium map centered on India."""
+    import folium
+    from folium.plugins import FastMarkerCluster
+
     m = folium.Map(location=center, zoom_start=zoom_start, tiles="cartodbpositron")
-    marker_cluster = MarkerCluster().add_to(m)
 
     if popup_fields is None:
         popup_fields = ["scientificName", "eventDate", "datasetID"]
 
-    for idx, row in df.iterrows():
-        lat, lon = row.get("decimalLatitude"), row.get("decimalLongitude")
-        if lat is None or lon is None:
-            continue
-        popup_html = "<br>".join(f"<b>{f}:</b> {row.get(f,'')}" for f in popup_fields)
-        folium.Marker([lat, lon], popup=popup_html).add_to(marker_cluster)
-
+    if "decimalLatitude" not in df.columns or "decimalLongitude" not in df.columns:
+        return m
+    # one vectorised null filter; NaN coordinates would otherwise reach Leaflet as invalid LatLngs
+    df = df.dropna(subset=["decimalLatitude", "decimalLongitude"]).reset_index(drop=True)
+
+    fields = [f for f in popup_fields if f in df.columns]
+    coords = df[["decimalLatitude", "decimalLongitude"]]
+    # markers are created client-side by Leaflet from one [lat, lon(, popup)] array
+    if fields:
+        rows = coords.assign(popup=build_popups(df, fields))
+        FastMarkerCluster(rows.to_numpy().tolist(), callback=MARKER_CALLBACK).add_to(m)
+    else:
+        FastMarkerCluster(coords.to_numpy().tolist()).add_to(m)
     return m
 
+def map_columns(df: pd.DataFrame, popup_fields: Optional[List[str]] = None) -> pd.DataFrame:
+    """Only the columns create_map reads, so the map cache key ignores everything else."""
+    if popup_fields is None:
+        popup_fields = ["scientificName", "eventDate", "datasetID"]
+    cols = ["decimalLatitude", "decimalLongitude"] + popup_fields
+    return df[[c for c in cols if c in df.columns]]
+
+@st.cache_data(ttl=300)
+def build_map_html(df: pd.DataFrame, center=(9.9, 76.6), zoom_start: int = 5) -> str:
+    """Rendered folium HTML, cached on the frame contents so reruns skip the map build.
+
+    The root document is rendered once and handed to components.html as is; _repr_html_ would
+    render it and then base64-wrap it in another iframe.
+    """
+    return create_map(df, center=center, zoom_start=zoom_start).get_root().render()
+
+def create_deck(df: pd.DataFrame, center=(9.9, 76.6), zoom: int = 5, mapbox_token: str = ""):
+    """deck.gl scatter layer for point counts folium can't render interactively."""
+    import pydeck as pdk
+
+    cols = [c for c in ("decimalLatitude", "decimalLongitude", "scientificName") if c in df.columns]
+    layer = pdk.Layer("ScatterplotLayer",
+                      data=df[cols],
+                      get_position="[decimalLongitude, decimalLatitude]",
+                      get_radius=3000,
+                      radius_min_pixels=2,
+                      get_fill_color=[0, 110, 200, 160],
+                      pickable=True)
+    view_state = pdk.ViewState(latitude=center[0], longitude=center[1], zoom=zoom)
+    tooltip = {"text": "{scientificName}"} if "scientificName" in cols else None
+    if mapbox_token:
+        return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip,
+                        map_provider="mapbox", map_style="mapbox://styles/mapbox/light-v9",
+                        api_keys={"mapbox": mapbox_token})
+    return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
+
+def unit_scale(values: pd.Series) -> np.ndarray:
+    """Min-max scale to [0, 1]; missing values and constant columns land in the middle."""
+    v = pd.to_numeric(values, errors="coerce").astype("float64")
+    lo, hi = v.min(), v.max()
+    if pd.isna(lo) or hi <= lo:
+        return np.full(len(v), 0.5)
+    return ((v - lo) / (hi - lo)).fillna(0.5).to_numpy()
+
+def measurements_deck(df: pd.DataFrame, center=(10, 75), zoom: int = 4):
+    """WebGL scatter of measurement points coloured by sst (blue→red) and sized by chl."""
+    import pydeck as pdk
+
+    df = df.dropna(subset=["lat", "lon"])
+    if "timestamp" in df.columns:
+        # deck.gl receives JSON; keep the tooltip value a plain string
+        df = df.assign(timestamp=df["timestamp"].astype(str))
+    # per-point style computed column-wise; deck.gl reads them as data attributes
+    heat = unit_scale(df["sst"]) if "sst" in df.columns else np.full(len(df), 0.5)
+    size = unit_scale(df["chl"]) if "chl" in df.columns else np.full(len(df), 0.5)
+    color = np.column_stack([255 * heat, np.full(len(df), 60), 255 * (1 - heat), np.full(len(df), 180)])
+    df = df.assign(color=color.astype(int).tolist(), radius=np.round(3 + 9 * size, 1))
+    layer = pdk.Layer("ScatterplotLayer", df,
+                      get_position=["lon", "lat"],
+                      get_fill_color="color",
+                      get_radius="radius",
+                      radius_units="pixels",
+                      pickable=True)
+    hover = [f"{c}: {{{c}}}" for c in ("sst", "chl", "timestamp") if c in df.columns]
+    view_state = pdk.ViewState(latitude=center[0], longitude=center[1], zoom=zoom)
+    return pdk.Deck(layers=[layer], initial_view_state=view_state,
+                    tooltip={"text": "\n".join(hover)} if hover else None)
+
 # ----------------------------
 # Pages: Home / Otoliths / eDNA / Ocean Data / Alerts
 # ----------------------------
@@ -250,9 +577,81 @@ def page_home():
     st.markdown("Welcome to the SIH MVP. Use the sidebar to navigate between pages.")
 
     st.subheader("Recent Occurrences Map")
-    df_occ = fetch_occurrences()
-    map_obj = create_map(df_occ)
-    st_folium(map_obj, width=800, height=500)
+    col_from, col_to = st.columns(2)
+    date_from = col_from.date_input("From", value=None)
+    date_to = col_to.date_input("To", value=None)
+    bbox_text = st.text_input("Bounding box (minlon,minlat,maxlon,maxlat)", "")
+    try:
+        bbox = canonical_bbox(bbox_text)
+    except ValueError:
+        st.error("Bounding box needs four comma-separated numbers; ignoring it.")
+        bbox = None
+    load_btn = st.button("Load occurrences")
+    show_demo = st.checkbox("Show demo data")
+
+    # nothing is fetched until asked for; the last result survives reruns
+    if "last_occurrences" not in st.session_state:
+        st.session_state["last_occurrences"] = None
+    if load_btn:
+        query = OccQuery(bbox=bbox, date_from=date_from, date_to=date_to)
+        st.session_state["last_query"] = query
+        df_occ = take_prewarmed_occurrences(BACKEND_API(), query)
+        if df_occ is None:
+            df_occ = fetch_occurrences(BACKEND_API(), query)
+        st.session_state["last_occurrences"] = df_occ
+        # a full page means the backend probably has more rows for this filter
+        st.session_state["occ_has_more"] = len(df_occ) >= query.limit
+    df_occ = st.session_state["last_occurrences"]
+    # the demo set replaces whatever was loaded for as long as the box is ticked
+    if show_demo:
+        df_occ = normalize_occurrences(synthetic_occurrences())
+    if df_occ is None:
+        st.info("Click Load occurrences to fetch")
+        return
+
+    query = st.session_state.get("last_query")
+    if not show_demo and query is not None and st.session_state.get("occ_has_more") and st.button("Load more"):
+        # only the next page is requested; earlier pages stay in the cache under their own offsets
+        query = replace(query, offset=query.offset + query.limit)
+        page = fetch_occurrences(BACKEND_API(), query)
+        if page.attrs.get("provenance", {}).get("source") == "synthetic":
+            # the fetch failed and fell back to demo rows; don't mix those into real results
+            st.warning("Could not load more occurrences from the backend.")
+        else:
+            st.session_state["last_query"] = query
+            st.session_state["occ_has_more"] = len(page) >= query.limit
+            # re-normalise so categories, center and zoom cover both pages
+            df_occ = normalize_occurrences(pd.concat([df_occ, page], ignore_index=True))
+            st.session_state["last_occurrences"] = df_occ
+    if df_occ.empty:
+        filtered = query is not None and (query.bbox or query.date_from or query.date_to)
+        st.info("No occurrences match these filters." if filtered else "No occurrences in the database yet.")
+        return
+    if not show_demo and df_occ.attrs.get("provenance", {}).get("source") == "synthetic":
+        st.caption("Showing synthetic demo data: the backend is empty or unreachable.")
+
+    search_name = st.text_input("Filter by species", "")
+    if search_name and "scientificName" in df_occ.columns:
+        df_occ = filter_species(df_occ, search_name)
+    center = df_occ.attrs.get("center", (9.9, 76.6))
+    zoom = df_occ.attrs.get("zoom", 5)
+    col_map, col_top = st.columns([3, 1])
+    with col_map:
+        if len(df_occ) > MAP_WEBGL_THRESHOLD:
+            # standalone HTML, because st.pydeck_chart only ships deck.to_json(), which omits api_keys
+            deck = create_deck(df_occ, center=center, zoom=zoom, mapbox_token=st.session_state.get("MAPBOX_TOKEN", ""))
+            components.html(deck.to_html(as_string=True), height=500)
+        else:
+            components.html(build_map_html(map_columns(df_occ), center, zoom), height=500)
+    with col_top:
+        st.markdown("**Top species**")
+        if "scientificName" in df_occ.columns:
+            # categorical value_counts is a bincount over the codes, so this stays cheap on every rerun
+            top = df_occ["scientificName"].value_counts(sort=True).iloc[:5]
+            st.dataframe(top[top > 0])
+
+    st.download_button("Download occurrences CSV", to_csv_bytes(df_occ),
+                       file_name="occurrences.csv", mime="text/csv")
 
 def page_otoliths():
     st.title("Otolith Classification")
@@ -267,27 +666,35 @@ def page_edna():
     uploaded_file = st.file_uploader("Upload eDNA CSV", type=["csv"])
     if uploaded_file:
         bytes_data = uploaded_file.read()
-        res = backend_client.load_occurrences_csv(bytes_data, uploaded_file.name)
+        try:
+            summary = summarize_edna(read_uploaded_csv(bytes_data))
+        except Exception as e:
+            # the summary is optional; a CSV pandas can't parse (e.g. ragged rows) may still load
+            logger.warning(f"eDNA summary skipped: {e}")
+            st.warning(f"Could not summarise this CSV ({e}); uploading it anyway.")
+            summary = None
+        if summary is not None:
+            st.subheader("Upload summary")
+            st.dataframe(summary)
+        res = backend_client.load_occurrences_csv(bytes_data, uploaded_file.name, base_url=BACKEND_API())
         st.write(res)
-        df_occ = fetch_occurrences()
-        st.dataframe(df_occ.head())
+        df_occ = fetch_occurrences(BACKEND_API())
+        display_dataframe(df_occ, max_rows=5)
 
 def page_ocean_data():
     st.title("Ocean Measurements")
-    df_meas = fetch_recent_measurements(limit=200)
-    st.dataframe(df_meas.head())
-    if not df_meas.empty:
-        fig = px.scatter_mapbox(df_meas, lat="lat", lon="lon", color="sst", size="chl",
-                                hover_data=["timestamp"],
-                                mapbox_style="carto-positron", zoom=4, center={"lat": 10, "lon": 75})
-        st.plotly_chart(fig, use_container_width=True)
+    df_meas = fetch_recent_measurements(BACKEND_API(), limit=200)
+    display_dataframe(df_meas, max_rows=5)
+    if not df_meas.empty and {"lat", "lon"} <= set(df_meas.columns):
+        components.html(measurements_deck(df_meas).to_html(as_string=True), height=600)
 
 def page_alerts():
     st.title("Alerts")
-    alerts = fetch_alerts()
+    alerts = fetch_alerts(BACKEND_API())
+    pdfs = download_alert_pdfs([a["id"] for a in alerts], BACKEND_API())
     for a in alerts:
         st.markdown(f"**{a.get('type')}** ({a.get('status')}) - {a.get('message')}")
-        pdf_bytes = download_alert_pdf(a["id"])
+        pdf_bytes = pdfs[a["id"]]
         if pdf_bytes:
             st.download_button(f"Download PDF for alert {a['id']}", pdf_bytes, file_name=f"alert_{a['id']}.pdf")
         if st.button(f"Send notification for alert {a['id']}"):
@@ -299,7 +706,8 @@ def page_alerts():
 def page_settings():
     st.title("Settings")
 
-    backend_url = st.text_input("Backend URL", value=st.session_state.get("SIH_BACKEND_URL"))
+    backend_url = st.text_input("Backend URL", value=st.session_state.get("SIH_BACKEND_URL"),
+                                help="Leave empty to use the bundled local database.")
     mapbox_token = st.text_input("Mapbox Token", value=st.session_state.get("MAPBOX_TOKEN"))
 
     if st.button("Save Settings"):
@@ -335,73 +743,59 @@ st.sidebar.title("Navigation")
 selected_page = st.sidebar.radio("Go to", list(PAGES.keys()))
 page_func = PAGES[selected_page]
 
-# Health check badge
-try:
-    health_status = backend_client.health()
-    status_color = "green" if health_status.get("status") == "ok" else "red"
-except Exception:
-    status_color = "red"
-st.sidebar.markdown(f"**Backend Health:** <span style='color:{status_color}'>●</span>", unsafe_allow_html=True)
+HEAVY_MODULES = ("folium", "folium.plugins", "PIL.Image", "pydeck")
 
-# Optional: force refresh button for caching
-if st.sidebar.button("Refresh Data"):
-    for key in st.session_state.keys():
-        if key.startswith("cache_"):
-            del st.session_state[key]
-    st.experimental_rerun()
+def import_quietly(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"prewarm import of {name} failed: {e}")
 
-# ----------------------------
-# Run selected page
-# ----------------------------
-page_func()
-# ----------------------------
-# Additional helpers / utilities
-# ----------------------------
-def clear_session_cache():
-    """Clear all cached Streamlit data and rerun."""
-    st.session_state.clear()
-    st.experimental_rerun()
+@st.cache_resource
+def prewarm_imports():
+    """Load the lazily imported page dependencies in the background, once per process, after the sidebar is up."""
+    threading.Thread(target=import_quietly, args=(HEAVY_MODULES,), daemon=True, name="sih-prewarm").start()
 
-def display_dataframe(df: pd.DataFrame, max_rows: int = 20):
-    """Safe display of a dataframe with optional truncation."""
-    if df.empty:
-        st.write("No data available.")
-        return
-    st.dataframe(df.head(max_rows))
+prewarm_imports()
 
-# ----------------------------
-# Error handling wrappers
-# ----------------------------
-def safe_call(fn, *args, **kwargs):
-    """Call a function and log exceptions; returns None on failure."""
+# Health check badge
+@st.cache_resource(ttl=15)
+def health_probe(backend_url: str) -> Future:
+    """Health probe of `backend_url` running on the executor, shared across reruns for a few seconds.
+
+    Submitted before the page runs and read after it, so the probe overlaps the page's own fetches.
+    """
+    return get_executor().submit(backend_client.health, base_url=backend_url)
+
+def render_health_badge(slot, probe: Future):
     try:
-        return fn(*args, **kwargs)
+        health_status = probe.result()
     except Exception as e:
-        logger.error(f"safe_call error: {e}")
-        st.error(f"An error occurred: {e}")
-        return None
+        logger.error(f"health check failed: {e}")
+        health_status = None
+    status_color = "green" if health_status and health_status.get("status") == "ok" else "red"
+    slot.markdown(f"**Backend Health:** <span style='color:{status_color}'>●</span>", unsafe_allow_html=True)
 
-# ----------------------------
-# Streamlit caching / refresh management
-# ----------------------------
-# Use @st.cache_data for expensive backend calls (already applied above)
-# Provide "Refresh Data" button in sidebar (already in part 3)
-# Optionally, can add per-page refresh buttons if needed
-# Example usage:
-# if st.button("Refresh Occurrences"):
-#     fetch_occurrences.clear()
-#     st.experimental_rerun()
+probe = health_probe(BACKEND_API())
+health_slot = st.sidebar.empty()
+
+# Optional: force refresh button for caching
+if st.sidebar.button("Refresh Data"):
+    # drop only the backend-derived caches; synthetic data and downscaled images stay valid
+    for cached in (fetch_occurrences, fetch_alerts, fetch_recent_measurements,
+                   build_map_html, health_probe):
+        cached.clear()
+    # a pending startup fetch predates the refresh too; dropping prewarm_at starts a fresh one
+    for key in ("last_occurrences", "last_query", "occ_has_more", "prewarm", "prewarm_at"):
+        st.session_state.pop(key, None)
+    st.rerun()
 
 # ----------------------------
-# Initialization
+# Run selected page
 # ----------------------------
-# Ensure session state defaults
-for key, default_val in [("SIH_BACKEND_URL", DEFAULT_BACKEND), ("MAPBOX_TOKEN", DEFAULT_MAPBOX)]:
-    if key not in st.session_state:
-        st.session_state[key] = default_val
-
-# Ensure backend seeded (demo)
-safe_call(backend_client.ensure_seeded)
+page_func()
+render_health_badge(health_slot, probe)
 
 # ----------------------------
 # End of streamlit_app.py